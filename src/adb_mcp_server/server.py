@@ -4,15 +4,35 @@ Enhanced ADB MCP Server for Flutter/Android Development
 Comprehensive tools for UI testing, debugging, and visual QA
 """
 
+import atexit
+import functools
+import inspect
 import subprocess
 import base64
 import json
 import re
+import shlex
+import socket
+import struct
+import tarfile
 import time
 import tempfile
 import os
+import queue
+import threading
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from mcp.server.fastmcp import FastMCP
+from pathlib import Path
+from xml.etree import ElementTree
+from mcp.server.fastmcp import FastMCP, Image
+
+# pybase64 is an optional SIMD-accelerated drop-in for the stdlib encoder
+try:
+    import pybase64 as _base64
+except ImportError:
+    _base64 = base64
 
 # Create the MCP server
 mcp = FastMCP("adb-dev-server")
@@ -21,12 +41,229 @@ mcp = FastMCP("adb-dev-server")
 # UTILITY FUNCTIONS
 # ============================================================================
 
+@functools.lru_cache(maxsize=None)
+def _adb_prefix(device_serial: str | None) -> tuple[str, ...]:
+    return ("adb", "-s", device_serial) if device_serial else ("adb",)
+
+
+def adb_command(args: list[str], device_serial: str | None = None) -> list[str]:
+    """Build the adb argv for a command, targeting device_serial if given"""
+    return [*_adb_prefix(device_serial), *args]
+
+
+class _PersistentShell:
+    """
+    Long-lived `adb shell` session for a single device.
+    Commands are written to stdin and their output is read back up to a
+    sentinel line carrying the exit status, followed by the command's stderr
+    and a closing sentinel, so each call costs one round trip instead of
+    spawning a new adb client.
+    """
+
+    def __init__(self, device_serial: str | None = None):
+        self.device_serial = device_serial
+        self.lock = threading.Lock()
+        self.marker = f"__END_{uuid.uuid4().hex}__"
+        self.proc: subprocess.Popen | None = None
+        self.lines: queue.Queue | None = None
+        self.reader: threading.Thread | None = None
+        # Set by close_shell once the session is dropped from _shells; it must not restart
+        self.retired = False
+
+    def _start(self) -> None:
+        self.proc = subprocess.Popen(
+            adb_command(["shell"], self.device_serial),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        # A reader thread keeps timeouts working on every platform (no select() on Windows pipes)
+        self.lines = queue.Queue()
+        self.reader = threading.Thread(target=self._pump, args=(self.proc.stdout, self.lines), daemon=True)
+        self.reader.start()
+
+    @staticmethod
+    def _pump(stream, lines: queue.Queue) -> None:
+        for line in iter(stream.readline, ""):
+            lines.put(line)
+        lines.put(None)
+
+    def close(self) -> None:
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            self.proc.kill()
+        # Reap adb so it doesn't linger as a zombie
+        self.proc.wait()
+        # The reader sees EOF once adb is gone; let it finish before its pipe is closed
+        self.reader.join(timeout=1)
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                # Flushing stdin into the dead process can fail
+                pass
+        self.proc = None
+        self.lines = None
+        self.reader = None
+
+    def run(self, command: str, timeout: int = 30) -> tuple[int | None, str, str]:
+        """
+        Run a shell command and return (exit_code, stdout, stderr).
+        exit_code is None if the session ended before the command finished.
+        """
+        return self.run_many([command], timeout)[0]
+
+    def _script(self, command: str) -> str:
+        # eval in a subshell keeps each call isolated (cwd, env, exit) and off our stdin,
+        # and a syntax error such as an unterminated quote fails the command instead of
+        # swallowing the rest of the session. stdout streams through fd 3 while stderr
+        # is captured and printed after the status sentinel; the leading newline
+        # guarantees the sentinel starts its own line.
+        return (
+            f"{{ _adb_mcp_err=$( ( eval {shlex.quote(command)} ) </dev/null 2>&1 1>&3 3>&- ); "
+            f"_adb_mcp_rc=$?; }} 3>&1\n"
+            f"printf '\\n{self.marker}%d\\n%s\\n{self.marker}\\n' $_adb_mcp_rc \"$_adb_mcp_err\"\n"
+        )
+
+    def run_many(self, commands: list[str], timeout: int = 30) -> list[tuple[int | None, str, str]]:
+        """
+        Pipeline several shell commands: all are written before any output is read,
+        so the device runs them back to back. Returns (exit_code, stdout, stderr) per command.
+        """
+        with self.lock:
+            if not self.retired:
+                return self._run_locked(commands, timeout)
+        # close_shell retired this session while we waited for it; use its replacement
+        return _get_shell(self.device_serial).run_many(commands, timeout)
+
+    def _run_locked(self, commands: list[str], timeout: int) -> list[tuple[int | None, str, str]]:
+        """run_many's body, called with the lock held"""
+        if self.proc is None or self.proc.poll() is not None:
+            # Reap a session that died on its own before replacing it
+            self.close()
+            self._start()
+        try:
+            self.proc.stdin.write("".join(self._script(command) for command in commands))
+            self.proc.stdin.flush()
+        except OSError:
+            self.close()
+            return [(None, "adb shell session closed", "")] * len(commands)
+
+        results = []
+        deadline = time.monotonic() + timeout
+        for command in commands:
+            output, errors = [], []
+            returncode = None
+            while True:
+                try:
+                    line = self.lines.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    # Session state is unknown after a timeout, start fresh next time
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                if line is None:
+                    self.close()
+                    results.append((None, "".join(output), "".join(errors)))
+                    return results + [(None, "", "")] * (len(commands) - len(results))
+                if returncode is None and line.startswith(self.marker):
+                    returncode = int(line[len(self.marker):])
+                elif returncode is not None and line == f"{self.marker}\n":
+                    # Both sections end with a newline added by the sentinel printf
+                    results.append((returncode, "".join(output)[:-1], "".join(errors)[:-1]))
+                    break
+                else:
+                    (output if returncode is None else errors).append(line)
+        return results
+
+
+_shells: dict[str | None, _PersistentShell] = {}
+_shells_lock = threading.Lock()
+
+
+def close_shell(device_serial: str | None = None) -> None:
+    """Close the device's persistent shell session; the next command starts a new one"""
+    with _shells_lock:
+        shell = _shells.pop(device_serial, None)
+    if shell:
+        # Wait for any command in flight rather than killing the session under it
+        with shell.lock:
+            shell.retired = True
+            shell.close()
+
+
+@atexit.register
+def _close_all_shells() -> None:
+    for device_serial in list(_shells):
+        close_shell(device_serial)
+
+
+def _get_shell(device_serial: str | None) -> _PersistentShell:
+    with _shells_lock:
+        shell = _shells.get(device_serial)
+        if shell is None:
+            shell = _shells[device_serial] = _PersistentShell(device_serial)
+        return shell
+
+
+def _shell_result(returncode: int | None, output: str, errors: str) -> str:
+    # Same contract as a one-off `adb shell` run through run_adb: stderr only matters on failure
+    if returncode is None:
+        return f"Error: {(output + errors).strip() or 'adb shell session ended'}"
+    if returncode != 0 and errors:
+        return f"Error: {errors}"
+    return output
+
+
+def run_shell(command: str, device_serial: str | None = None, timeout: int = 30) -> str:
+    """Run a shell command through the device's persistent adb shell session"""
+    try:
+        return _shell_result(*_get_shell(device_serial).run(command, timeout))
+    except subprocess.TimeoutExpired:
+        return "Error: Command timed out"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+def run_shell_batch(commands: list[str], device_serial: str | None = None, timeout: int = 30) -> list[str]:
+    """
+    Run independent shell commands pipelined through the persistent session and
+    return each command's output (or error) separately.
+    """
+    try:
+        return [_shell_result(*result) for result in _get_shell(device_serial).run_many(commands, timeout)]
+    except subprocess.TimeoutExpired:
+        return ["Error: Command timed out"] * len(commands)
+    except Exception as e:
+        return [f"Error: {str(e)}"] * len(commands)
+
+
+_SECTION_MARKER = "__ADB_MCP_SECTION__"
+
+
+def run_shell_sections(commands: list[str], device_serial: str | None = None) -> list[str]:
+    """
+    Run several shell commands as one script and return each command's output.
+    Unlike run_shell_batch, the commands share a shell, so later ones can use earlier variables.
+    """
+    script = f"; echo {_SECTION_MARKER}; ".join(commands)
+    output = run_shell(script, device_serial)
+    sections = output.split(_SECTION_MARKER)
+    # Drop the newline echo leaves after each marker
+    sections = sections[:1] + [section[1:] if section.startswith("\n") else section for section in sections[1:]]
+    return sections + [""] * (len(commands) - len(sections))
+
+
 def run_adb(args: list[str], device_serial: str | None = None, timeout: int = 30) -> str:
     """Run an ADB command and return output"""
-    cmd = ["adb"]
-    if device_serial:
-        cmd.extend(["-s", device_serial])
-    cmd.extend(args)
+    # adb joins shell arguments with spaces, so the persistent session sees the same command line
+    if len(args) > 1 and args[0] == "shell":
+        return run_shell(" ".join(args[1:]), device_serial, timeout)
+
+    cmd = adb_command(args, device_serial)
     
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
@@ -41,25 +278,179 @@ def run_adb(args: list[str], device_serial: str | None = None, timeout: int = 30
 
 def run_adb_binary(args: list[str], device_serial: str | None = None) -> bytes:
     """Run an ADB command and return binary output"""
-    cmd = ["adb"]
-    if device_serial:
-        cmd.extend(["-s", device_serial])
-    cmd.extend(args)
+    cmd = adb_command(args, device_serial)
     
     result = subprocess.run(cmd, capture_output=True)
     return result.stdout
 
 
+def run_adb_to_file(args: list[str], path: str, device_serial: str | None = None) -> int:
+    """Run an ADB command with stdout written straight to a file, returning the bytes written"""
+    cmd = adb_command(args, device_serial)
+    
+    # adb writes into the file descriptor directly, so the output never passes through Python
+    with open(path, 'wb') as f:
+        subprocess.run(cmd, stdout=f, stderr=subprocess.DEVNULL)
+    return os.path.getsize(path)
+
+
+# Per device, bumped by state-changing tools so ttl_cache never serves results from before them
+_state_versions: dict[str | None, int] = {}
+_state_versions_lock = threading.Lock()
+
+
+def bump_state_version(device_serial: str | None = None) -> None:
+    """Invalidate the device's versioned ttl_cache entries"""
+    # The *_all tools act on several devices from a thread pool
+    with _state_versions_lock:
+        _state_versions[device_serial] = _state_versions.get(device_serial, 0) + 1
+
+
+def changes_device_state(func):
+    """Mark a tool that acts on a device, so that device's cached reads are dropped once it has run"""
+    signature = inspect.signature(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            device_serial = signature.bind(*args, **kwargs).arguments.get("device_serial")
+        except TypeError:
+            # Let the call itself report the bad arguments
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            bump_state_version(device_serial)
+    
+    return wrapper
+
+
+def _is_not_error(result) -> bool:
+    return not (isinstance(result, str) and result.startswith("Error"))
+
+
+def ttl_cache(seconds: float = 0.5, versioned: bool = True, cache_if=_is_not_error):
+    """
+    Reuse a getter's result for identical calls made within `seconds` of each other.
+    Versioned entries are also dropped by any changes_device_state tool run on the
+    same device_serial; only results
+    passing `cache_if` are kept. The wrapper's cache_evict(*args, **kwargs) forgets one
+    call's entry and cache_clear() forgets everything.
+    """
+    def decorator(func):
+        cache: dict[tuple, tuple[int, float, object]] = {}
+        signature = inspect.signature(func)
+        
+        def make_key(args, kwargs) -> tuple:
+            # Binding makes f("X") and f(device_serial="X") share one entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Lists (e.g. fields) are keyed as tuples so those calls are cached too
+            return tuple(
+                (name, tuple(value) if isinstance(value, list) else value)
+                for name, value in bound.arguments.items()
+            )
+        
+        def copy(result):
+            # Callers may modify a dict they get back, which must not reach the cache
+            return dict(result) if isinstance(result, dict) else result
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = make_key(args, kwargs)
+                cached = cache.get(key)
+            except TypeError:
+                # Other unhashable arguments (e.g. a dict) are simply not cached
+                return func(*args, **kwargs)
+            now = time.monotonic()
+            version = _state_versions.get(dict(key).get("device_serial"), 0) if versioned else 0
+            if cached and cached[0] == version and now - cached[1] < seconds:
+                return copy(cached[2])
+            result = func(*args, **kwargs)
+            if cache_if(result):
+                cache[key] = (version, now, copy(result))
+            return result
+        
+        def cache_evict(*args, **kwargs) -> None:
+            cache.pop(make_key(args, kwargs), None)
+        
+        wrapper.cache_evict = cache_evict
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+# Environment variables that point the adb client at a server other than 127.0.0.1
+_ADB_SERVER_LOCATION_VARS = ("ADB_SERVER_SOCKET", "ANDROID_ADB_SERVER_ADDRESS")
+
+
+def query_adb_server(service: str, timeout: float = 5) -> str | None:
+    """
+    Ask the local adb server for a host service (e.g. "host:devices-l") over its socket,
+    skipping the adb client process. Returns None if the server can't be reached.
+    """
+    # Only the default 127.0.0.1:<port> server is handled here; anything else goes through the client
+    if any(os.environ.get(name) for name in _ADB_SERVER_LOCATION_VARS):
+        return None
+    request = service.encode("utf-8")
+    try:
+        # A malformed port falls back to the client like any other failure
+        port = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+            sock.sendall(b"%04x" % len(request) + request)
+            reader = sock.makefile("rb")
+            if reader.read(4) != b"OKAY":
+                return None
+            length = int(reader.read(4), 16)
+            return reader.read(length).decode("utf-8", errors="replace")
+    except (OSError, OverflowError, ValueError):
+        # OverflowError: a port outside 0-65535
+        return None
+
+
 # ============================================================================
 # DEVICE MANAGEMENT
 # ============================================================================
 
+# Devices come and go, so the listing is only reused for a moment
 @mcp.tool()
+@ttl_cache(seconds=2.0, versioned=False)
 def list_devices() -> str:
     """List all connected Android devices with details"""
+    # Ask the running adb server directly; the adb client is only needed to start it
+    devices = query_adb_server("host:devices-l")
+    if devices is not None:
+        return "List of devices attached\n" + devices + "\n"
     return run_adb(["devices", "-l"])
 
 
+def connected_serials() -> list[str]:
+    """Serials of every device that is online (state "device")"""
+    serials = []
+    for line in list_devices().splitlines()[1:]:
+        fields = line.split()
+        if len(fields) >= 2 and fields[1] == "device":
+            serials.append(fields[0])
+    return serials
+
+
+def fan_out(func, *args) -> dict[str, object]:
+    """Run func(*args, device_serial=serial) on every connected device concurrently"""
+    serials = connected_serials()
+    if not serials:
+        return {}
+    # Each device has its own shell session, so the calls overlap instead of queueing
+    with ThreadPoolExecutor(max_workers=len(serials)) as executor:
+        futures = {serial: executor.submit(func, *args, device_serial=serial) for serial in serials}
+    return {serial: future.result() for serial, future in futures.items()}
+
+
+_BATTERY_LEVEL_RE = re.compile(r'^\s*level:([^\n]*)', re.M)
+_BATTERY_STATUS_RE = re.compile(r'^\s*status:([^\n]*)', re.M)
+_BATTERY_STATUS_MAP = {'2': 'Charging', '3': 'Discharging', '4': 'Not charging', '5': 'Full'}
+
+
 @mcp.tool()
 def get_device_info(device_serial: str | None = None) -> dict:
     """Get comprehensive device information"""
@@ -76,36 +467,55 @@ def get_device_info(device_serial: str | None = None) -> dict:
         ("timezone", "persist.sys.timezone"),
     ]
     
-    info = {}
-    for name, prop in props:
-        info[name] = run_adb(["shell", "getprop", prop], device_serial).strip()
+    # Fetch every property plus screen and battery info in one round trip
+    prop_names = " ".join(prop for _, prop in props)
+    prop_output, screen_size, screen_density, battery = run_shell_batch([
+        f'for p in {prop_names}; do echo "$p=$(getprop $p)"; done',
+        "wm size",
+        "wm density",
+        "dumpsys battery",
+    ], device_serial)
+    
+    values = dict(line.split("=", 1) for line in prop_output.splitlines() if "=" in line)
+    info = {name: values.get(prop, "").strip() for name, prop in props}
     
     # Add screen info
-    info["screen_size"] = run_adb(["shell", "wm", "size"], device_serial).strip()
-    info["screen_density"] = run_adb(["shell", "wm", "density"], device_serial).strip()
+    info["screen_size"] = screen_size.strip()
+    info["screen_density"] = screen_density.strip()
     
     # Battery info
-    battery = run_adb(["shell", "dumpsys", "battery"], device_serial)
-    for line in battery.split('\n'):
-        if 'level:' in line:
-            info["battery_level"] = line.split(':')[1].strip() + "%"
-        if 'status:' in line:
-            status_map = {'2': 'Charging', '3': 'Discharging', '4': 'Not charging', '5': 'Full'}
-            status = line.split(':')[1].strip()
-            info["battery_status"] = status_map.get(status, status)
+    level_match = _BATTERY_LEVEL_RE.search(battery)
+    if level_match:
+        info["battery_level"] = level_match.group(1).strip() + "%"
+    status_match = _BATTERY_STATUS_RE.search(battery)
+    if status_match:
+        status = status_match.group(1).strip()
+        info["battery_status"] = _BATTERY_STATUS_MAP.get(status, status)
     
     return info
 
 
+_PHYSICAL_SIZE_RE = re.compile(r'Physical size: (\d+)x(\d+)')
+_OVERRIDE_SIZE_RE = re.compile(r'Override size: (\d+)x(\d+)')
+_PHYSICAL_DENSITY_RE = re.compile(r'Physical density: (\d+)')
+
+
+def _has_screen_specs(specs: dict) -> bool:
+    # Don't remember a failed read (e.g. device offline)
+    return bool(specs["width_px"] and specs["height_px"] and specs["density_dpi"])
+
+
+# Taps and swipes don't change the screen size, so this outlives state changes; the
+# size/density tools clear it and the TTL catches changes made through shell_command
 @mcp.tool()
+@ttl_cache(seconds=30.0, versioned=False, cache_if=_has_screen_specs)
 def get_screen_specs(device_serial: str | None = None) -> dict:
     """Get detailed screen specifications - useful for responsive design"""
-    size_output = run_adb(["shell", "wm", "size"], device_serial)
-    density_output = run_adb(["shell", "wm", "density"], device_serial)
+    size_output, density_output = run_shell_batch(["wm size", "wm density"], device_serial)
     
     # Parse physical size
-    size_match = re.search(r'Physical size: (\d+)x(\d+)', size_output)
-    override_match = re.search(r'Override size: (\d+)x(\d+)', size_output)
+    size_match = _PHYSICAL_SIZE_RE.search(size_output)
+    override_match = _OVERRIDE_SIZE_RE.search(size_output)
     
     width, height = 0, 0
     if override_match:
@@ -115,7 +525,7 @@ def get_screen_specs(device_serial: str | None = None) -> dict:
     
     # Parse density
     density = 0
-    density_match = re.search(r'Physical density: (\d+)', density_output)
+    density_match = _PHYSICAL_DENSITY_RE.search(density_output)
     if density_match:
         density = int(density_match.group(1))
     
@@ -134,6 +544,13 @@ def get_screen_specs(device_serial: str | None = None) -> dict:
     }
 
 
+@mcp.tool()
+def invalidate_screen_specs(device_serial: str | None = None) -> str:
+    """Forget cached screen specs so the next call re-reads them from the device"""
+    get_screen_specs.cache_evict(device_serial)
+    return "Screen specs cache cleared"
+
+
 def get_density_bucket(dpi: int) -> str:
     """Map DPI to Android density bucket"""
     if dpi <= 120: return "ldpi"
@@ -148,24 +565,66 @@ def get_density_bucket(dpi: int) -> str:
 # SCREENSHOTS & VISUAL CAPTURE
 # ============================================================================
 
+def _encode_png(width: int, height: int, rgba: memoryview) -> bytes:
+    """Encode RGBA pixels as a PNG using fast zlib compression"""
+    stride = width * 4
+    # Feed scanlines, each prefixed with filter type 0 (None), to the compressor as
+    # views into the framebuffer so the pixels are never copied into a second buffer
+    compressor = zlib.compressobj(1)
+    parts = []
+    for y in range(height):
+        parts.append(compressor.compress(b"\x00"))
+        parts.append(compressor.compress(rgba[y * stride:(y + 1) * stride]))
+    parts.append(compressor.flush())
+    
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", b"".join(parts))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _capture_raw_png(device_serial: str | None = None) -> bytes:
+    """
+    Capture the raw framebuffer and encode it to PNG on the host.
+    Returns b"" if the device uses a pixel format other than RGBA_8888.
+    """
+    data = run_adb_binary(["exec-out", "screencap"], device_serial)
+    if len(data) < 12:
+        return b""
+    
+    width, height, pixel_format = struct.unpack_from("<3I", data)
+    # Android 9+ adds a colour space field, growing the header from 12 to 16 bytes
+    header_size = len(data) - width * height * 4
+    if pixel_format != 1 or header_size not in (12, 16):
+        return b""
+    # The view stays valid for as long as data is referenced, i.e. until encoding returns
+    return _encode_png(width, height, memoryview(data)[header_size:])
+
+
 @mcp.tool()
-def screenshot(device_serial: str | None = None) -> dict:
+def screenshot(device_serial: str | None = None, raw_capture: bool = False) -> Image:
     """
     Take a screenshot of the device screen.
-    Returns base64 encoded PNG image that can be viewed directly.
+    Returns the PNG as MCP image content that can be viewed directly.
+    
+    raw_capture: pull the uncompressed framebuffer and encode the PNG on the host
+    instead of the device. Faster on emulators and other high-bandwidth links.
     """
-    img_data = run_adb_binary(["exec-out", "screencap", "-p"], device_serial)
+    img_data = _capture_raw_png(device_serial) if raw_capture else b""
+    if not img_data:
+        img_data = run_adb_binary(["exec-out", "screencap", "-p"], device_serial)
     
+    # FastMCP reports the exception to the client as an error result
     if not img_data or len(img_data) < 100:
-        return {"error": "Failed to capture screenshot"}
+        raise RuntimeError("Failed to capture screenshot")
     
-    img_base64 = base64.b64encode(img_data).decode('utf-8')
-    return {
-        "type": "image",
-        "format": "png",
-        "size_bytes": len(img_data),
-        "data": img_base64
-    }
+    # The SDK encodes the raw bytes once when building the response
+    return Image(data=img_data, format="png")
 
 
 @mcp.tool()
@@ -174,15 +633,13 @@ def screenshot_to_file(
     device_serial: str | None = None
 ) -> str:
     """Save screenshot to a local file"""
-    img_data = run_adb_binary(["exec-out", "screencap", "-p"], device_serial)
+    size = run_adb_to_file(["exec-out", "screencap", "-p"], filename, device_serial)
     
-    if not img_data or len(img_data) < 100:
+    if size < 100:
+        os.remove(filename)
         return "Error: Failed to capture screenshot"
     
-    with open(filename, 'wb') as f:
-        f.write(img_data)
-    
-    return f"Screenshot saved to {filename} ({len(img_data)} bytes)"
+    return f"Screenshot saved to {filename} ({size} bytes)"
 
 
 @mcp.tool()
@@ -229,15 +686,38 @@ def pull_recordings(
     if "No such file" in files or not files.strip():
         return "No recordings found on device"
     
-    pulled = []
-    for f in files.strip().split('\n'):
-        f = f.strip()
-        if f.endswith('.mp4'):
-            local_path = os.path.join(local_dir, os.path.basename(f))
-            run_adb(["pull", f, local_path], device_serial)
-            pulled.append(local_path)
+    remote_files = [f.strip() for f in files.strip().split('\n') if f.strip().endswith('.mp4')]
+    if not remote_files:
+        return "No recordings found on device"
     
-    return f"Pulled {len(pulled)} recordings to {local_dir}: {pulled}"
+    # adb pull takes many sources per invocation, so split the files into a few
+    # batches and pull those concurrently to keep the USB link busy
+    batches = [remote_files[i::4] for i in range(min(4, len(remote_files)))]
+    
+    def pull(batch: list[str]) -> str:
+        return run_adb(["pull", *batch, local_dir], device_serial, timeout=120 * len(batch))
+    
+    def file_stamp(path: str) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    local_paths = [os.path.join(local_dir, os.path.basename(f)) for f in remote_files]
+    # A copy left by an earlier pull must not count as pulled now, so only files
+    # that appear or change during this pull are reported
+    before = {path: file_stamp(path) for path in local_paths}
+    
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        outputs = list(executor.map(pull, batches))
+    
+    pulled = [path for path in local_paths if file_stamp(path) not in (None, before[path])]
+    errors = [output.strip() for output in outputs if output.startswith("Error")]
+    result = f"Pulled {len(pulled)} recordings to {local_dir}: {pulled}"
+    if errors:
+        result += f"\nErrors: {errors}"
+    return result
 
 
 # ============================================================================
@@ -250,56 +730,85 @@ def get_ui_hierarchy(device_serial: str | None = None) -> str:
     Dump the complete UI hierarchy as XML.
     Shows all visible elements, their properties, bounds, and content descriptions.
     """
-    run_adb(["shell", "uiautomator", "dump", "/sdcard/ui_dump.xml"], device_serial)
-    output = run_adb(["shell", "cat", "/sdcard/ui_dump.xml"], device_serial)
-    run_adb(["shell", "rm", "/sdcard/ui_dump.xml"], device_serial)
+    # Stream the dump straight to stdout; the tool appends a "UI hierchary dumped to" trailer
+    output = run_adb(["exec-out", "uiautomator", "dump", "/dev/tty"], device_serial)
+    if "<hierarchy" in output:
+        output = output[:output.rfind(">") + 1]
+    else:
+        # Some devices refuse /dev/tty, so dump to a file and read it back in one round trip
+        output = run_adb([
+            "shell", "uiautomator", "dump", "/sdcard/ui_dump.xml", ">/dev/null",
+            "&&", "cat", "/sdcard/ui_dump.xml", ";", "rm", "-f", "/sdcard/ui_dump.xml"
+        ], device_serial)
     return output
 
 
+# Dumps are reused for this long so a find followed by tap_element costs one dump;
+# any tool that acts on the device drops them
+_cached_ui_hierarchy = ttl_cache(seconds=1.0, cache_if=lambda output: "<hierarchy" in output)(get_ui_hierarchy)
+
+
+# Regex fallback for dumps ElementTree rejects (e.g. truncated output).
+# Attribute names must follow whitespace so e.g. long-clickable never shadows clickable
+_NODE_RE = re.compile(r'<node\b[^>]*>')
+_ATTRS_RE = re.compile(r'\s(text|content-desc|resource-id|class|clickable|bounds)="([^"]*)"')
+_BOUNDS_RE = re.compile(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]')
+
+
+def _iter_ui_nodes(xml: str):
+    """Yield the attributes of every node in a UI hierarchy dump"""
+    try:
+        root = ElementTree.fromstring(xml.encode("utf-8"))
+    except ElementTree.ParseError:
+        for match in _NODE_RE.finditer(xml):
+            yield dict(_ATTRS_RE.findall(match.group()))
+        return
+    for node in root.iter("node"):
+        yield node.attrib
+
+
+def _parse_bounds(bounds: str | None) -> tuple[int, int, int, int] | None:
+    """Parse a "[x1,y1][x2,y2]" bounds attribute"""
+    bounds_match = _BOUNDS_RE.fullmatch(bounds) if bounds else None
+    if not bounds_match:
+        return None
+    x1, y1, x2, y2 = map(int, bounds_match.groups())
+    return x1, y1, x2, y2
+
+
 @mcp.tool()
 def get_clickable_elements(device_serial: str | None = None) -> list[dict]:
     """
     Get all clickable/interactive elements on screen with their coordinates.
     Perfect for understanding what can be tapped.
     """
-    xml = get_ui_hierarchy(device_serial)
+    xml = _cached_ui_hierarchy(device_serial)
     elements = []
     
     # Parse clickable elements
-    pattern = r'<node[^>]*clickable="true"[^>]*>'
-    for match in re.finditer(pattern, xml):
-        node = match.group()
+    for attrs in _iter_ui_nodes(xml):
+        if attrs.get('clickable') != 'true':
+            continue
         
         element = {}
         
-        # Extract text
-        text_match = re.search(r'text="([^"]*)"', node)
-        if text_match:
-            element['text'] = text_match.group(1)
-        
-        # Extract content-desc
-        desc_match = re.search(r'content-desc="([^"]*)"', node)
-        if desc_match:
-            element['content_desc'] = desc_match.group(1)
-        
-        # Extract resource-id
-        id_match = re.search(r'resource-id="([^"]*)"', node)
-        if id_match:
-            element['resource_id'] = id_match.group(1)
+        if 'text' in attrs:
+            element['text'] = attrs['text']
+        if 'content-desc' in attrs:
+            element['content_desc'] = attrs['content-desc']
+        if 'resource-id' in attrs:
+            element['resource_id'] = attrs['resource-id']
         
         # Extract bounds and calculate center
-        bounds_match = re.search(r'bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"', node)
-        if bounds_match:
-            x1, y1 = int(bounds_match.group(1)), int(bounds_match.group(2))
-            x2, y2 = int(bounds_match.group(3)), int(bounds_match.group(4))
+        bounds = _parse_bounds(attrs.get('bounds'))
+        if bounds:
+            x1, y1, x2, y2 = bounds
             element['bounds'] = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
             element['center'] = {'x': (x1 + x2) // 2, 'y': (y1 + y2) // 2}
             element['size'] = {'width': x2 - x1, 'height': y2 - y1}
         
-        # Extract class
-        class_match = re.search(r'class="([^"]*)"', node)
-        if class_match:
-            element['class'] = class_match.group(1)
+        if 'class' in attrs:
+            element['class'] = attrs['class']
         
         if element:
             elements.append(element)
@@ -317,32 +826,26 @@ def find_element_by_text(
     Find UI elements containing specific text.
     Returns element details including tap coordinates.
     """
-    xml = get_ui_hierarchy(device_serial)
+    xml = _cached_ui_hierarchy(device_serial)
     elements = []
+    text_lower = text.lower()
     
-    for match in re.finditer(r'<node[^>]*>', xml):
-        node = match.group()
-        
-        text_match = re.search(r'text="([^"]*)"', node)
-        desc_match = re.search(r'content-desc="([^"]*)"', node)
-        
-        found_text = text_match.group(1) if text_match else ""
-        found_desc = desc_match.group(1) if desc_match else ""
+    for attrs in _iter_ui_nodes(xml):
+        found_text = attrs.get('text', "")
+        found_desc = attrs.get('content-desc', "")
         
         # Check if text matches
-        matches = False
         if partial_match:
-            matches = text.lower() in found_text.lower() or text.lower() in found_desc.lower()
+            matches = text_lower in found_text.lower() or text_lower in found_desc.lower()
         else:
             matches = text == found_text or text == found_desc
         
         if matches:
             element = {'text': found_text, 'content_desc': found_desc}
             
-            bounds_match = re.search(r'bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"', node)
-            if bounds_match:
-                x1, y1 = int(bounds_match.group(1)), int(bounds_match.group(2))
-                x2, y2 = int(bounds_match.group(3)), int(bounds_match.group(4))
+            bounds = _parse_bounds(attrs.get('bounds'))
+            if bounds:
+                x1, y1, x2, y2 = bounds
                 element['center'] = {'x': (x1 + x2) // 2, 'y': (y1 + y2) // 2}
                 element['bounds'] = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
             
@@ -360,24 +863,20 @@ def find_element_by_id(
     Find a UI element by its resource ID.
     Returns element details including tap coordinates.
     """
-    xml = get_ui_hierarchy(device_serial)
+    xml = _cached_ui_hierarchy(device_serial)
     
     # Match partial resource ID (e.g., "button_submit" matches "com.app:id/button_submit")
-    for match in re.finditer(r'<node[^>]*>', xml):
-        node = match.group()
-        
-        id_match = re.search(r'resource-id="([^"]*)"', node)
-        if id_match and resource_id in id_match.group(1):
-            element = {'resource_id': id_match.group(1)}
+    for attrs in _iter_ui_nodes(xml):
+        found_id = attrs.get('resource-id')
+        if found_id and resource_id in found_id:
+            element = {'resource_id': found_id}
             
-            text_match = re.search(r'text="([^"]*)"', node)
-            if text_match:
-                element['text'] = text_match.group(1)
+            if 'text' in attrs:
+                element['text'] = attrs['text']
             
-            bounds_match = re.search(r'bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"', node)
-            if bounds_match:
-                x1, y1 = int(bounds_match.group(1)), int(bounds_match.group(2))
-                x2, y2 = int(bounds_match.group(3)), int(bounds_match.group(4))
+            bounds = _parse_bounds(attrs.get('bounds'))
+            if bounds:
+                x1, y1, x2, y2 = bounds
                 element['center'] = {'x': (x1 + x2) // 2, 'y': (y1 + y2) // 2}
                 element['bounds'] = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
             
@@ -391,12 +890,14 @@ def find_element_by_id(
 # ============================================================================
 
 @mcp.tool()
+@changes_device_state
 def tap(x: int, y: int, device_serial: str | None = None) -> str:
     """Tap at screen coordinates (x, y)"""
     return run_adb(["shell", "input", "tap", str(x), str(y)], device_serial)
 
 
 @mcp.tool()
+@changes_device_state
 def tap_element(
     text: str | None = None,
     resource_id: str | None = None,
@@ -424,6 +925,7 @@ def tap_element(
 
 
 @mcp.tool()
+@changes_device_state
 def long_press(x: int, y: int, duration_ms: int = 1000, device_serial: str | None = None) -> str:
     """Long press at coordinates for specified duration"""
     return run_adb([
@@ -433,15 +935,20 @@ def long_press(x: int, y: int, duration_ms: int = 1000, device_serial: str | Non
 
 
 @mcp.tool()
+@changes_device_state
 def double_tap(x: int, y: int, device_serial: str | None = None) -> str:
     """Double tap at coordinates"""
-    run_adb(["shell", "input", "tap", str(x), str(y)], device_serial)
-    time.sleep(0.1)
-    run_adb(["shell", "input", "tap", str(x), str(y)], device_serial)
+    # Both taps and the pause run on the device in one round trip
+    run_adb([
+        "shell", "input", "tap", str(x), str(y), ";",
+        "sleep", "0.1", ";",
+        "input", "tap", str(x), str(y)
+    ], device_serial)
     return f"Double tapped at ({x}, {y})"
 
 
 @mcp.tool()
+@changes_device_state
 def swipe(
     start_x: int, 
     start_y: int, 
@@ -495,25 +1002,40 @@ def scroll_to_text(
     return f"Text '{text}' not found after {max_scrolls} scrolls"
 
 
+_INPUT_TEXT_CHUNK = 500
+# input text reads %s as a space; shlex.quote handles every other character
+_INPUT_TEXT_TABLE = str.maketrans({" ": "%s"})
+
+
 @mcp.tool()
+@changes_device_state
 def input_text(text: str, device_serial: str | None = None) -> str:
     """Type text into the currently focused field"""
-    # Escape special characters for shell
-    escaped = text.replace(" ", "%s").replace("&", "\\&").replace("<", "\\<").replace(">", "\\>")
-    return run_adb(["shell", "input", "text", escaped], device_serial)
+    # Long text is typed in chunks, all sent in one round trip
+    chunks = [text[i:i + _INPUT_TEXT_CHUNK] for i in range(0, len(text), _INPUT_TEXT_CHUNK)] or [""]
+    command = "; ".join(f"input text {shlex.quote(chunk.translate(_INPUT_TEXT_TABLE))}" for chunk in chunks)
+    return run_adb(["shell", command], device_serial)
 
 
 @mcp.tool()
+@changes_device_state
 def clear_text_field(length: int = 50, device_serial: str | None = None) -> str:
     """Clear text in current field by sending delete keys"""
-    # Move to end and delete backwards
-    run_adb(["shell", "input", "keyevent", "KEYCODE_MOVE_END"], device_serial)
-    for _ in range(length):
-        run_adb(["shell", "input", "keyevent", "KEYCODE_DEL"], device_serial)
+    # Move to end and delete backwards; input accepts many keycodes in one invocation
+    run_adb(["shell", "input", "keyevent", "KEYCODE_MOVE_END"] + ["KEYCODE_DEL"] * length, device_serial)
     return f"Cleared up to {length} characters"
 
 
+_KEY_MAP = {
+    'HOME': '3', 'BACK': '4', 'ENTER': '66', 'DELETE': '67', 'DEL': '67',
+    'TAB': '61', 'SPACE': '62', 'MENU': '82', 'SEARCH': '84',
+    'VOLUME_UP': '24', 'VOLUME_DOWN': '25', 'POWER': '26',
+    'PAGE_UP': '92', 'PAGE_DOWN': '93', 'ESCAPE': '111', 'ESC': '111'
+}
+
+
 @mcp.tool()
+@changes_device_state
 def press_key(keycode: str, device_serial: str | None = None) -> str:
     """
     Press a key by keycode name or number.
@@ -527,14 +1049,7 @@ def press_key(keycode: str, device_serial: str | None = None) -> str:
     - PAGE_UP (92), PAGE_DOWN (93)
     """
     # Handle common names
-    key_map = {
-        'HOME': '3', 'BACK': '4', 'ENTER': '66', 'DELETE': '67', 'DEL': '67',
-        'TAB': '61', 'SPACE': '62', 'MENU': '82', 'SEARCH': '84',
-        'VOLUME_UP': '24', 'VOLUME_DOWN': '25', 'POWER': '26',
-        'PAGE_UP': '92', 'PAGE_DOWN': '93', 'ESCAPE': '111', 'ESC': '111'
-    }
-    
-    key = key_map.get(keycode.upper(), keycode)
+    key = _KEY_MAP.get(keycode.upper(), keycode)
     return run_adb(["shell", "input", "keyevent", key], device_serial)
 
 
@@ -551,6 +1066,7 @@ def press_home(device_serial: str | None = None) -> str:
 
 
 @mcp.tool()
+@changes_device_state
 def press_recent_apps(device_serial: str | None = None) -> str:
     """Open recent apps / app switcher"""
     return run_adb(["shell", "input", "keyevent", "KEYCODE_APP_SWITCH"], device_serial)
@@ -560,11 +1076,20 @@ def press_recent_apps(device_serial: str | None = None) -> str:
 # APP MANAGEMENT
 # ============================================================================
 
+_FOCUSED_ACTIVITY_RE = re.compile(r'^.*(?:ResumedActivity|mFocusedActivity).*$', re.M)
+_COMPONENT_RE = re.compile(r'([a-zA-Z0-9_.]+)/([a-zA-Z0-9_.]+)')
+
+
 @mcp.tool()
+@ttl_cache()
 def get_current_activity(device_serial: str | None = None) -> dict:
     """Get the currently focused app and activity"""
     output = run_adb(["shell", "dumpsys", "activity", "activities"], device_serial)
-    
+    return _parse_current_activity(output)
+
+
+def _parse_current_activity(output: str) -> dict:
+    """Extract the focused component from `dumpsys activity activities` output"""
     result = {
         "package": None,
         "activity": None,
@@ -572,19 +1097,19 @@ def get_current_activity(device_serial: str | None = None) -> dict:
     }
     
     # Look for ResumedActivity or mFocusedActivity
-    for line in output.split('\n'):
-        if 'ResumedActivity' in line or 'mFocusedActivity' in line:
-            match = re.search(r'([a-zA-Z0-9_.]+)/([a-zA-Z0-9_.]+)', line)
-            if match:
-                result['package'] = match.group(1)
-                result['activity'] = match.group(2)
-                result['full_component'] = f"{match.group(1)}/{match.group(2)}"
-            break
+    line_match = _FOCUSED_ACTIVITY_RE.search(output)
+    if line_match:
+        match = _COMPONENT_RE.search(line_match.group())
+        if match:
+            result['package'] = match.group(1)
+            result['activity'] = match.group(2)
+            result['full_component'] = f"{match.group(1)}/{match.group(2)}"
     
     return result
 
 
 @mcp.tool()
+@changes_device_state
 def launch_app(package_name: str, device_serial: str | None = None) -> str:
     """Launch an app by package name"""
     return run_adb([
@@ -594,6 +1119,7 @@ def launch_app(package_name: str, device_serial: str | None = None) -> str:
 
 
 @mcp.tool()
+@changes_device_state
 def launch_activity(
     package_name: str, 
     activity_name: str,
@@ -605,12 +1131,14 @@ def launch_activity(
 
 
 @mcp.tool()
+@changes_device_state
 def force_stop_app(package_name: str, device_serial: str | None = None) -> str:
     """Force stop an app"""
     return run_adb(["shell", "am", "force-stop", package_name], device_serial)
 
 
 @mcp.tool()
+@changes_device_state
 def clear_app_data(package_name: str, device_serial: str | None = None) -> str:
     """Clear all data for an app (like fresh install)"""
     return run_adb(["shell", "pm", "clear", package_name], device_serial)
@@ -623,18 +1151,26 @@ def list_packages(
     device_serial: str | None = None
 ) -> list[str]:
     """List installed packages, optionally filtered"""
-    args = ["shell", "pm", "list", "packages"]
-    if not include_system:
-        args.append("-3")  # Third-party only
-    
-    output = run_adb(args, device_serial)
-    packages = [line.replace("package:", "").strip() 
-                for line in output.split('\n') if line.strip()]
+    pm_command = "pm list packages" if include_system else "pm list packages -3"  # -3: third-party only
     
+    # Strip, filter and sort on the device so only the result crosses USB.
+    # pm runs first on its own so a failure isn't masked by sort's exit status
+    script = f"out=$({pm_command}) || exit 1; printf '%s\\n' \"$out\" | sed -n 's/^package://p'"
     if filter_text:
-        packages = [p for p in packages if filter_text.lower() in p.lower()]
+        script += f" | grep -i -F {shlex.quote(filter_text)}"
+    script += " | sort"
     
-    return sorted(packages)
+    output = run_adb(["shell", script], device_serial)
+    if output.startswith("Error"):
+        return []
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+_VERSION_NAME_RE = re.compile(r'versionName=(\S+)')
+_VERSION_CODE_RE = re.compile(r'versionCode=(\d+)')
+_FIRST_INSTALL_RE = re.compile(r'firstInstallTime=(.+)')
+_LAST_UPDATE_RE = re.compile(r'lastUpdateTime=(.+)')
+_TARGET_SDK_RE = re.compile(r'targetSdk=(\d+)')
 
 
 @mcp.tool()
@@ -645,26 +1181,26 @@ def get_app_info(package_name: str, device_serial: str | None = None) -> dict:
     info = {"package": package_name}
     
     # Extract version
-    version_match = re.search(r'versionName=(\S+)', dump)
+    version_match = _VERSION_NAME_RE.search(dump)
     if version_match:
         info['version_name'] = version_match.group(1)
     
-    version_code_match = re.search(r'versionCode=(\d+)', dump)
+    version_code_match = _VERSION_CODE_RE.search(dump)
     if version_code_match:
         info['version_code'] = version_code_match.group(1)
     
     # First install time
-    install_match = re.search(r'firstInstallTime=(.+)', dump)
+    install_match = _FIRST_INSTALL_RE.search(dump)
     if install_match:
         info['first_install'] = install_match.group(1).strip()
     
     # Last update time
-    update_match = re.search(r'lastUpdateTime=(.+)', dump)
+    update_match = _LAST_UPDATE_RE.search(dump)
     if update_match:
         info['last_update'] = update_match.group(1).strip()
     
     # Target SDK
-    sdk_match = re.search(r'targetSdk=(\d+)', dump)
+    sdk_match = _TARGET_SDK_RE.search(dump)
     if sdk_match:
         info['target_sdk'] = sdk_match.group(1)
     
@@ -672,12 +1208,14 @@ def get_app_info(package_name: str, device_serial: str | None = None) -> dict:
 
 
 @mcp.tool()
+@changes_device_state
 def install_apk(apk_path: str, device_serial: str | None = None) -> str:
     """Install an APK file"""
     return run_adb(["install", "-r", apk_path], device_serial)
 
 
 @mcp.tool()
+@changes_device_state
 def uninstall_app(package_name: str, device_serial: str | None = None) -> str:
     """Uninstall an app"""
     return run_adb(["uninstall", package_name], device_serial)
@@ -703,16 +1241,20 @@ def get_logcat(
     args = ["shell", "logcat", "-d", "-t", str(lines)]
     
     if filter_tag:
-        args.extend(["-s", f"{filter_tag}:{filter_level}"])
+        args.extend(["-s", shlex.quote(f"{filter_tag}:{filter_level}")])
     
-    output = run_adb(args, device_serial)
-    
-    # Filter by package if specified
+    # Filter by package if specified: logcat filters by PID itself, falling back to
+    # matching the package name when the app is not running, all in one round trip
     if package_name:
-        lines_list = output.split('\n')
-        output = '\n'.join(l for l in lines_list if package_name in l)
+        logcat = " ".join(args[1:])
+        package = shlex.quote(package_name)
+        args = [
+            "shell", f"pid=$(pidof {package});",
+            f'if [ -n "$pid" ]; then {logcat} --pid=${{pid%% *}};',
+            f"else {logcat} | grep -F {package}; fi",
+        ]
     
-    return output
+    return run_adb(args, device_serial)
 
 
 @mcp.tool()
@@ -724,41 +1266,25 @@ def clear_logcat(device_serial: str | None = None) -> str:
 @mcp.tool()
 def get_flutter_logs(lines: int = 100, device_serial: str | None = None) -> str:
     """Get Flutter-specific logs"""
-    output = run_adb(["shell", "logcat", "-d", "-t", str(lines)], device_serial)
+    # Case-insensitive "flutter" also covers FlutterEngine and FlutterActivity
+    output = run_adb(["shell", f"logcat -d -t {int(lines)} | grep -i -E 'flutter|dart'"], device_serial)
     
-    # Filter for Flutter-related logs
-    flutter_keywords = ['flutter', 'dart', 'FlutterEngine', 'FlutterActivity']
-    log_lines = output.split('\n')
-    flutter_lines = [l for l in log_lines 
-                     if any(kw.lower() in l.lower() for kw in flutter_keywords)]
-    
-    return '\n'.join(flutter_lines) if flutter_lines else "No Flutter logs found"
+    return output if output.strip() else "No Flutter logs found"
+
+
+_CRASH_PATTERN = "FATAL EXCEPTION|AndroidRuntime|crash|Exception|Error"
 
 
 @mcp.tool()
 def get_crash_logs(package_name: str | None = None, device_serial: str | None = None) -> str:
     """Get crash/exception logs"""
-    output = run_adb(["shell", "logcat", "-d", "-t", "500"], device_serial)
-    
-    # Look for crash indicators
-    crash_keywords = ['FATAL EXCEPTION', 'AndroidRuntime', 'crash', 'Exception', 'Error']
-    log_lines = output.split('\n')
-    
-    crash_lines = []
-    in_crash = False
-    
-    for line in log_lines:
-        if any(kw in line for kw in crash_keywords):
-            in_crash = True
-        if in_crash:
-            crash_lines.append(line)
-            if line.strip() == '' or len(crash_lines) > 50:
-                in_crash = False
-    
+    # Filter on the device so only crash lines cross USB; AndroidRuntime tags every stack trace line
+    command = f"logcat -d -t 500 | grep -E {shlex.quote(_CRASH_PATTERN)}"
     if package_name:
-        crash_lines = [l for l in crash_lines if package_name in l or 'at ' in l]
+        command += f" | grep -F -e {shlex.quote(package_name)} -e 'at '"
+    output = run_adb(["shell", command], device_serial)
     
-    return '\n'.join(crash_lines) if crash_lines else "No crash logs found"
+    return output if output.strip() else "No crash logs found"
 
 
 @mcp.tool()
@@ -785,18 +1311,15 @@ def get_cpu_info(device_serial: str | None = None) -> str:
     return run_adb(["shell", "top", "-n", "1", "-b"], device_serial)
 
 
+_KEY_VALUE_RE = re.compile(r'^([^:\n]*):(.*)$', re.M)
+
+
 @mcp.tool()
 def get_battery_stats(device_serial: str | None = None) -> dict:
     """Get detailed battery statistics"""
     output = run_adb(["shell", "dumpsys", "battery"], device_serial)
     
-    stats = {}
-    for line in output.split('\n'):
-        if ':' in line:
-            key, value = line.split(':', 1)
-            stats[key.strip()] = value.strip()
-    
-    return stats
+    return {key.strip(): value.strip() for key, value in _KEY_VALUE_RE.findall(output)}
 
 
 @mcp.tool()
@@ -815,10 +1338,13 @@ def get_frame_stats(package_name: str, device_serial: str | None = None) -> str:
 # NETWORK & CONNECTIVITY
 # ============================================================================
 
+_INET_RE = re.compile(r'inet (\d+\.\d+\.\d+\.\d+)')
+
+
 @mcp.tool()
 def get_network_info(device_serial: str | None = None) -> dict:
     """Get network connectivity information"""
-    wifi = run_adb(["shell", "dumpsys", "wifi"], device_serial)
+    wifi, ip_output = run_shell_batch(["dumpsys wifi", "ip addr show wlan0"], device_serial)
     
     info = {
         "wifi_enabled": "Wi-Fi is enabled" in wifi,
@@ -826,8 +1352,7 @@ def get_network_info(device_serial: str | None = None) -> dict:
     }
     
     # Get IP address
-    ip_output = run_adb(["shell", "ip", "addr", "show", "wlan0"], device_serial)
-    ip_match = re.search(r'inet (\d+\.\d+\.\d+\.\d+)', ip_output)
+    ip_match = _INET_RE.search(ip_output)
     if ip_match:
         info['ip_address'] = ip_match.group(1)
     
@@ -835,6 +1360,7 @@ def get_network_info(device_serial: str | None = None) -> dict:
 
 
 @mcp.tool()
+@changes_device_state
 def toggle_wifi(enable: bool, device_serial: str | None = None) -> str:
     """Enable or disable WiFi"""
     state = "enable" if enable else "disable"
@@ -842,17 +1368,21 @@ def toggle_wifi(enable: bool, device_serial: str | None = None) -> str:
 
 
 @mcp.tool()
+@changes_device_state
 def toggle_airplane_mode(enable: bool, device_serial: str | None = None) -> str:
     """Enable or disable airplane mode"""
     value = "1" if enable else "0"
-    run_adb(["shell", "settings", "put", "global", "airplane_mode_on", value], device_serial)
-    # Broadcast the change
+    # Set and broadcast the change in one round trip
     intent = "android.intent.action.AIRPLANE_MODE"
-    run_adb(["shell", "am", "broadcast", "-a", intent], device_serial)
+    run_adb([
+        "shell", "settings", "put", "global", "airplane_mode_on", value, ";",
+        "am", "broadcast", "-a", intent
+    ], device_serial)
     return f"Airplane mode {'enabled' if enable else 'disabled'}"
 
 
 @mcp.tool()
+@changes_device_state
 def set_proxy(host: str, port: int, device_serial: str | None = None) -> str:
     """Set HTTP proxy for the device - useful for debugging network requests"""
     return run_adb([
@@ -862,6 +1392,7 @@ def set_proxy(host: str, port: int, device_serial: str | None = None) -> str:
 
 
 @mcp.tool()
+@changes_device_state
 def clear_proxy(device_serial: str | None = None) -> str:
     """Clear HTTP proxy settings"""
     return run_adb(["shell", "settings", "put", "global", "http_proxy", ":0"], device_serial)
@@ -871,36 +1402,96 @@ def clear_proxy(device_serial: str | None = None) -> str:
 # DEVELOPER OPTIONS & SETTINGS
 # ============================================================================
 
-@mcp.tool()
-def toggle_show_taps(enable: bool, device_serial: str | None = None) -> str:
-    """Show visual feedback for taps - useful for demos/recordings"""
-    value = "1" if enable else "0"
-    return run_adb(["shell", "settings", "put", "system", "show_touches", value], device_serial)
-
-
-@mcp.tool()
-def toggle_show_layout_bounds(enable: bool, device_serial: str | None = None) -> str:
-    """Show layout bounds for all views - great for debugging layouts"""
-    value = "true" if enable else "false"
-    return run_adb([
-        "shell", "setprop", "debug.layout", value
-    ], device_serial)
+_TALKBACK_SERVICE = "com.google.android.marvin.talkback/com.google.android.marvin.talkback.TalkBackService"
+
+# On/off switches, generated as toggle_<name> tools: name -> (description, enable command, disable command)
+_TOGGLES = {
+    "show_taps": (
+        "Show visual feedback for taps - useful for demos/recordings",
+        "settings put system show_touches 1",
+        "settings put system show_touches 0",
+    ),
+    "show_layout_bounds": (
+        "Show layout bounds for all views - great for debugging layouts",
+        "setprop debug.layout true",
+        "setprop debug.layout false",
+    ),
+    "talkback": (
+        "Enable or disable TalkBack accessibility service",
+        f"settings put secure enabled_accessibility_services {_TALKBACK_SERVICE}",
+        "settings put secure enabled_accessibility_services ''",
+    ),
+    "high_contrast": (
+        "Enable or disable high contrast text",
+        "settings put secure high_text_contrast_enabled 1",
+        "settings put secure high_text_contrast_enabled 0",
+    ),
+    "color_inversion": (
+        "Enable or disable display color inversion",
+        "settings put secure accessibility_display_inversion_enabled 1",
+        "settings put secure accessibility_display_inversion_enabled 0",
+    ),
+}
+
+
+def _make_toggle(name: str, description: str, on_command: str, off_command: str):
+    """Build a toggle tool whose shell commands are fixed up front"""
+    def toggle(enable: bool, device_serial: str | None = None) -> str:
+        return run_adb(["shell", on_command if enable else off_command], device_serial)
+    toggle.__name__ = f"toggle_{name}"
+    toggle.__doc__ = description
+    return changes_device_state(toggle)
+
+
+def _register_toggles() -> None:
+    """Register a toggle_<name> tool for every _TOGGLES entry"""
+    for name, (description, on_command, off_command) in _TOGGLES.items():
+        mcp.tool(name=f"toggle_{name}")(_make_toggle(name, description, on_command, off_command))
+
+
+_register_toggles()
+
+
+@mcp.tool()
+@changes_device_state
+def toggle_many(states: dict[str, bool], device_serial: str | None = None) -> str:
+    """
+    Set several toggles in one round trip, e.g. {"show_taps": true, "high_contrast": false}.
+    Names: show_taps, show_layout_bounds, talkback, high_contrast, color_inversion
+    """
+    if not states:
+        return "No toggles given"
+    unknown = [name for name in states if name not in _TOGGLES]
+    if unknown:
+        return f"Unknown toggles: {unknown}. Use: {list(_TOGGLES)}"
+    
+    commands = [_TOGGLES[name][1 if enable else 2] for name, enable in states.items()]
+    # Pipelined, so each toggle reports its own result like the single toggle tools
+    results = run_shell_batch(commands, device_serial)
+    errors = {name: result for name, result in zip(states, results) if result.startswith("Error")}
+    if errors:
+        return f"Error setting toggles: {errors}"
+    return f"Toggles set: {states}"
 
 
 @mcp.tool()
+@changes_device_state
 def set_animation_scale(scale: float = 1.0, device_serial: str | None = None) -> str:
     """
     Set animation scale (0 = off, 1 = normal, 0.5 = fast).
     Useful for speeding up UI tests.
     """
     scale_str = str(scale)
-    run_adb(["shell", "settings", "put", "global", "window_animation_scale", scale_str], device_serial)
-    run_adb(["shell", "settings", "put", "global", "transition_animation_scale", scale_str], device_serial)
-    run_adb(["shell", "settings", "put", "global", "animator_duration_scale", scale_str], device_serial)
+    # All three settings in one round trip
+    run_adb(["shell", "; ".join(
+        f"settings put global {name} {scale_str}"
+        for name in ("window_animation_scale", "transition_animation_scale", "animator_duration_scale")
+    )], device_serial)
     return f"Animation scale set to {scale}"
 
 
 @mcp.tool()
+@changes_device_state
 def rotate_screen(orientation: str = "portrait", device_serial: str | None = None) -> str:
     """
     Rotate screen orientation.
@@ -922,34 +1513,54 @@ def rotate_screen(orientation: str = "portrait", device_serial: str | None = Non
     if orientation == 'auto':
         run_adb(["shell", "settings", "put", "system", "accelerometer_rotation", "1"], device_serial)
     else:
-        run_adb(["shell", "settings", "put", "system", "accelerometer_rotation", "0"], device_serial)
-        run_adb(["shell", "settings", "put", "system", "user_rotation", user_rotation], device_serial)
+        run_adb([
+            "shell", "settings", "put", "system", "accelerometer_rotation", "0", ";",
+            "settings", "put", "system", "user_rotation", user_rotation
+        ], device_serial)
     
     return f"Screen rotation set to {orientation}"
 
 
 @mcp.tool()
+def rotate_screen_all(orientation: str = "portrait") -> dict:
+    """Rotate the screen on every connected device at once, keyed by serial"""
+    return fan_out(rotate_screen, orientation)
+
+
+@mcp.tool()
+@changes_device_state
 def change_screen_size(width: int, height: int, device_serial: str | None = None) -> str:
     """Change screen resolution - useful for testing different screen sizes"""
-    return run_adb(["shell", "wm", "size", f"{width}x{height}"], device_serial)
+    output = run_adb(["shell", "wm", "size", f"{width}x{height}"], device_serial)
+    invalidate_screen_specs(device_serial)
+    return output
 
 
 @mcp.tool()
+@changes_device_state
 def reset_screen_size(device_serial: str | None = None) -> str:
     """Reset screen size to physical default"""
-    return run_adb(["shell", "wm", "size", "reset"], device_serial)
+    output = run_adb(["shell", "wm", "size", "reset"], device_serial)
+    invalidate_screen_specs(device_serial)
+    return output
 
 
 @mcp.tool()
+@changes_device_state
 def change_density(dpi: int, device_serial: str | None = None) -> str:
     """Change screen density - useful for testing different DPI"""
-    return run_adb(["shell", "wm", "density", str(dpi)], device_serial)
+    output = run_adb(["shell", "wm", "density", str(dpi)], device_serial)
+    invalidate_screen_specs(device_serial)
+    return output
 
 
 @mcp.tool()
+@changes_device_state
 def reset_density(device_serial: str | None = None) -> str:
     """Reset density to physical default"""
-    return run_adb(["shell", "wm", "density", "reset"], device_serial)
+    output = run_adb(["shell", "wm", "density", "reset"], device_serial)
+    invalidate_screen_specs(device_serial)
+    return output
 
 
 # ============================================================================
@@ -969,15 +1580,107 @@ def pull_file(remote_path: str, local_path: str, device_serial: str | None = Non
 
 
 @mcp.tool()
-def list_files(remote_path: str = "/sdcard/", device_serial: str | None = None) -> str:
-    """List files in a directory on the device"""
-    return run_adb(["shell", "ls", "-la", remote_path], device_serial)
+def push_tree(local_dir: str, remote_dir: str, device_serial: str | None = None) -> str:
+    """Push a directory tree in one adb session, skipping files already up to date on the device"""
+    return run_adb(["push", "--sync", local_dir, remote_dir], device_serial, timeout=300)
+
+
+@mcp.tool()
+def push_files(local_paths: list[str], remote_dir: str, device_serial: str | None = None) -> str:
+    """
+    Push many files into one device directory as a single tar stream.
+    Much faster than one push per file when copying lots of small files.
+    """
+    missing = [path for path in local_paths if not os.path.isfile(path)]
+    if missing:
+        return f"Error: Local files not found: {missing}"
+    
+    remote = shlex.quote(remote_dir)
+    cmd = adb_command(["exec-in", f"mkdir -p {remote} && tar -xf - -C {remote}"], device_serial)
+    
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    except Exception as e:
+        return f"Error: {str(e)}"
+    
+    try:
+        # The archive is written straight into adb's stdin, never buffered whole in memory
+        try:
+            with tarfile.open(fileobj=proc.stdin, mode="w|") as tar:
+                for path in local_paths:
+                    tar.add(path, arcname=os.path.basename(path))
+        except BrokenPipeError:
+            # adb exited early (e.g. mkdir failed); its stderr below says why
+            pass
+        # communicate() flushes and closes stdin itself, which ends the archive stream
+        stderr = proc.communicate(timeout=300)[1]
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return "Error: Command timed out"
+    except Exception as e:
+        # Don't leave exec-in running on a half-written archive
+        proc.kill()
+        proc.communicate()
+        return f"Error: {str(e)}"
+    
+    if proc.returncode != 0:
+        return f"Error: {stderr.decode('utf-8', errors='replace')}"
+    return f"Pushed {len(local_paths)} files to {remote_dir}"
+
+
+@mcp.tool()
+def list_files(
+    remote_path: str = "/sdcard/",
+    device_serial: str | None = None,
+    pattern: str | None = None,
+    max_entries: int | None = None
+) -> str:
+    """
+    List files in a directory on the device.
+    pattern: only keep lines matching this extended regex (e.g. "\\.mp4$")
+    max_entries: stop after this many lines (at least 1; None for no limit) - useful for very large directories
+    """
+    if max_entries is not None and max_entries < 1:
+        return f"Error: max_entries must be at least 1, got {max_entries}"
+    
+    # Filter and truncate on the device so large listings never cross USB in full.
+    # remote_path stays unquoted, as before, so globs like /sdcard/*.mp4 keep working.
+    command = f"ls -la {remote_path}"
+    if pattern:
+        command += f" | grep -E {shlex.quote(pattern)}"
+    if max_entries is not None:
+        command += f" | head -n {int(max_entries)}"
+    return run_adb(["shell", command], device_serial)
+
+
+# Files above this size are pulled over adb's sync protocol instead of streamed through the shell
+_READ_FILE_PULL_THRESHOLD = 64 * 1024
+_LARGE_FILE_MARKER = "__ADB_MCP_LARGE_FILE__"
 
 
 @mcp.tool()
 def read_file(remote_path: str, device_serial: str | None = None) -> str:
     """Read a text file from the device"""
-    return run_adb(["shell", "cat", remote_path], device_serial)
+    # Small files are read with cat in the same round trip as the size check
+    path = shlex.quote(remote_path)
+    output = run_adb([
+        "shell", f'if [ "$(stat -c %s {path} 2>/dev/null || echo 0)" -gt {_READ_FILE_PULL_THRESHOLD} ];',
+        f"then echo {_LARGE_FILE_MARKER}; else cat {path}; fi"
+    ], device_serial)
+    if output.strip() != _LARGE_FILE_MARKER:
+        return output
+    
+    # adb pull uses larger packets than the shell and does no line-ending translation
+    fd, local_path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        result = run_adb(["pull", remote_path, local_path], device_serial, timeout=120)
+        if result.startswith("Error"):
+            return result
+        return Path(local_path).read_text(encoding="utf-8", errors="replace")
+    finally:
+        os.remove(local_path)
 
 
 # ============================================================================
@@ -985,6 +1688,7 @@ def read_file(remote_path: str, device_serial: str | None = None) -> str:
 # ============================================================================
 
 @mcp.tool()
+@changes_device_state
 def shell_command(command: str, device_serial: str | None = None) -> str:
     """
     Execute an arbitrary ADB shell command.
@@ -994,11 +1698,20 @@ def shell_command(command: str, device_serial: str | None = None) -> str:
 
 
 @mcp.tool()
+def shell_command_all(command: str) -> dict:
+    """Execute a shell command on every connected device at once, keyed by serial"""
+    return fan_out(shell_command, command)
+
+
+@mcp.tool()
+@changes_device_state
 def reboot_device(mode: str = "normal", device_serial: str | None = None) -> str:
     """
     Reboot the device.
     mode: 'normal', 'bootloader', 'recovery'
     """
+    # The device drops its shell sessions on reboot, so start fresh afterwards
+    close_shell(device_serial)
     if mode == "normal":
         return run_adb(["reboot"], device_serial)
     elif mode in ["bootloader", "recovery"]:
@@ -1010,31 +1723,53 @@ def reboot_device(mode: str = "normal", device_serial: str | None = None) -> str
 # FLUTTER-SPECIFIC TOOLS
 # ============================================================================
 
+def _grep_fields(command: str, fields: list[str] | None) -> str:
+    """Append an on-device filter keeping only lines that contain one of the fields"""
+    if not fields:
+        return command
+    return command + " | grep -F" + "".join(f" -e {shlex.quote(field)}" for field in fields)
+
+
 @mcp.tool()
+@ttl_cache()
 def get_flutter_performance_overlay(
     package_name: str,
-    device_serial: str | None = None
+    device_serial: str | None = None,
+    fields: list[str] | None = None
 ) -> str:
-    """Get Flutter rendering performance info"""
-    output = run_adb([
-        "shell", "dumpsys", "gfxinfo", package_name, "framestats"
-    ], device_serial)
-    return output
+    """
+    Get Flutter rendering performance info.
+    fields: only return lines containing one of these strings (e.g. ["Janky frames", "percentile"])
+    """
+    command = _grep_fields(f"dumpsys gfxinfo {shlex.quote(package_name)} framestats", fields)
+    return run_adb(["shell", command], device_serial)
+
+
+_FLUTTER_ACTIVITY_MARKER = "__ADB_MCP_FLUTTER_ACTIVITY__"
 
 
 @mcp.tool()
 def check_flutter_app_running(device_serial: str | None = None) -> dict:
-    """Check if a Flutter app is currently in foreground"""
-    activity = get_current_activity(device_serial)
+    """
+    Check if a Flutter app is currently in foreground.
+    recent_flutter_logs is None when the activity name already proves Flutter
+    and logcat was not checked.
+    """
+    # One round trip: only the focused activity line comes back, and the device
+    # skips the logcat probe when that activity is already a Flutter one
+    activity_output, logs = run_shell_sections([
+        "focus=$(dumpsys activity activities | grep -E 'ResumedActivity|mFocusedActivity' | head -n 1); "
+        'echo "$focus"',
+        f"if echo \"$focus\" | grep -qi '/[a-zA-Z0-9_.$]*flutter'; then echo {_FLUTTER_ACTIVITY_MARKER}; "
+        "else logcat -d -t 20 -s flutter; fi",
+    ], device_serial)
+    activity = _parse_current_activity(activity_output)
     
-    # Check if it's a Flutter activity
-    is_flutter = False
-    if activity.get('activity'):
-        is_flutter = 'flutter' in activity['activity'].lower()
+    # The device decides whether it's a Flutter activity, so the skip and the answer always agree
+    is_flutter = logs.strip() == _FLUTTER_ACTIVITY_MARKER
     
-    # Also check for Flutter in logcat
-    logs = run_adb(["shell", "logcat", "-d", "-t", "20", "-s", "flutter"], device_serial)
-    has_recent_flutter_logs = len(logs.strip()) > 0
+    # Otherwise fall back to recent Flutter output in logcat
+    has_recent_flutter_logs = None if is_flutter else len(logs.strip()) > 0
     
     return {
         "current_activity": activity,
@@ -1047,13 +1782,20 @@ def check_flutter_app_running(device_serial: str | None = None) -> dict:
 # ACCESSIBILITY & QA TESTING
 # ============================================================================
 
+# toggle_talkback, toggle_high_contrast and toggle_color_inversion are generated from _TOGGLES
+
 @mcp.tool()
-def get_accessibility_info(device_serial: str | None = None) -> str:
-    """Get accessibility service information - useful for a11y testing"""
-    return run_adb(["shell", "dumpsys", "accessibility"], device_serial)
+@ttl_cache()
+def get_accessibility_info(device_serial: str | None = None, fields: list[str] | None = None) -> str:
+    """
+    Get accessibility service information - useful for a11y testing.
+    fields: only return lines containing one of these strings (e.g. ["Enabled services", "touchExplorationEnabled"])
+    """
+    return run_adb(["shell", _grep_fields("dumpsys accessibility", fields)], device_serial)
 
 
 @mcp.tool()
+@changes_device_state
 def set_font_scale(scale: float = 1.0, device_serial: str | None = None) -> str:
     """
     Set system font scale (0.85 = small, 1.0 = normal, 1.15 = large, 1.3 = largest).
@@ -1064,45 +1806,12 @@ def set_font_scale(scale: float = 1.0, device_serial: str | None = None) -> str:
     ], device_serial)
 
 
-@mcp.tool()
-def toggle_talkback(enable: bool, device_serial: str | None = None) -> str:
-    """Enable or disable TalkBack accessibility service"""
-    service = "com.google.android.marvin.talkback/com.google.android.marvin.talkback.TalkBackService"
-    if enable:
-        return run_adb([
-            "shell", "settings", "put", "secure", 
-            "enabled_accessibility_services", service
-        ], device_serial)
-    else:
-        return run_adb([
-            "shell", "settings", "put", "secure",
-            "enabled_accessibility_services", ""
-        ], device_serial)
-
-
-@mcp.tool()
-def toggle_high_contrast(enable: bool, device_serial: str | None = None) -> str:
-    """Enable or disable high contrast text"""
-    value = "1" if enable else "0"
-    return run_adb([
-        "shell", "settings", "put", "secure", "high_text_contrast_enabled", value
-    ], device_serial)
-
-
-@mcp.tool()
-def toggle_color_inversion(enable: bool, device_serial: str | None = None) -> str:
-    """Enable or disable display color inversion"""
-    value = "1" if enable else "0"
-    return run_adb([
-        "shell", "settings", "put", "secure", "accessibility_display_inversion_enabled", value
-    ], device_serial)
-
-
 # ============================================================================
 # EMULATOR SPECIFIC
 # ============================================================================
 
 @mcp.tool()
+@changes_device_state
 def set_location(
     latitude: float, 
     longitude: float,
@@ -1115,6 +1824,7 @@ def set_location(
 
 
 @mcp.tool()
+@changes_device_state
 def send_sms(
     phone_number: str,
     message: str,
@@ -1127,6 +1837,7 @@ def send_sms(
 
 
 @mcp.tool()
+@changes_device_state
 def simulate_call(
     phone_number: str,
     device_serial: str | None = None
@@ -1143,37 +1854,44 @@ def simulate_call(
 def capture_screen_for_comparison(
     screen_name: str,
     output_dir: str = "./screenshots",
-    device_serial: str | None = None
+    device_serial: str | None = None,
+    include_base64: bool = False
 ) -> dict:
     """
     Capture screenshot with metadata for visual comparison.
     Saves PNG and returns info for comparing with Figma designs.
+    Set include_base64 to also embed the PNG in the response.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Get device specs
-    specs = get_screen_specs(device_serial)
-    activity = get_current_activity(device_serial)
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
     
-    # Capture screenshot
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Capture screenshot on its own adb connection while the shell session fetches metadata.
+    # Millisecond timestamps keep rapid captures of the same screen from overwriting each other.
+    timestamp = f"{time.time_ns() // 1_000_000:013d}"
     filename = f"{screen_name}_{timestamp}.png"
-    filepath = os.path.join(output_dir, filename)
+    filepath = str(out_dir / filename)
     
-    img_data = run_adb_binary(["exec-out", "screencap", "-p"], device_serial)
-    with open(filepath, 'wb') as f:
-        f.write(img_data)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The PNG streams from adb straight into the file
+        capture = executor.submit(run_adb_to_file, ["exec-out", "screencap", "-p"], filepath, device_serial)
+        specs = get_screen_specs(device_serial)
+        activity = get_current_activity(device_serial)
+        size_bytes = capture.result()
     
-    return {
+    result = {
         "filepath": filepath,
         "filename": filename,
         "screen_name": screen_name,
         "timestamp": timestamp,
         "device_specs": specs,
         "current_activity": activity,
-        "size_bytes": len(img_data),
-        "base64": base64.b64encode(img_data).decode('utf-8')
+        "size_bytes": size_bytes
     }
+    # The file is usually all the caller needs, so only encode on request
+    if include_base64:
+        with open(filepath, 'rb') as f:
+            result["base64"] = _base64.b64encode(f.read()).decode('ascii')
+    return result
 
 
 @mcp.tool()
@@ -1182,28 +1900,26 @@ def get_all_text_on_screen(device_serial: str | None = None) -> list[dict]:
     Extract all visible text from current screen.
     Useful for verifying text content matches designs.
     """
-    xml = get_ui_hierarchy(device_serial)
+    xml = _cached_ui_hierarchy(device_serial)
     texts = []
     
-    for match in re.finditer(r'<node[^>]*>', xml):
-        node = match.group()
+    for attrs in _iter_ui_nodes(xml):
+        text = attrs.get('text', "")
+        if not text.strip():
+            continue
         
-        text_match = re.search(r'text="([^"]*)"', node)
-        if text_match and text_match.group(1).strip():
-            text_info = {'text': text_match.group(1)}
-            
-            bounds_match = re.search(r'bounds="\[(\d+),(\d+)\]\[(\d+),(\d+)\]"', node)
-            if bounds_match:
-                x1, y1 = int(bounds_match.group(1)), int(bounds_match.group(2))
-                x2, y2 = int(bounds_match.group(3)), int(bounds_match.group(4))
-                text_info['bounds'] = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
-                text_info['position'] = {'x': (x1 + x2) // 2, 'y': (y1 + y2) // 2}
-            
-            class_match = re.search(r'class="([^"]*)"', node)
-            if class_match:
-                text_info['element_type'] = class_match.group(1).split('.')[-1]
-            
-            texts.append(text_info)
+        text_info = {'text': text}
+        
+        bounds = _parse_bounds(attrs.get('bounds'))
+        if bounds:
+            x1, y1, x2, y2 = bounds
+            text_info['bounds'] = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+            text_info['position'] = {'x': (x1 + x2) // 2, 'y': (y1 + y2) // 2}
+        
+        if 'class' in attrs:
+            text_info['element_type'] = attrs['class'].rpartition('.')[2]
+        
+        texts.append(text_info)
     
     return texts
 
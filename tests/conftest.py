@@ -0,0 +1,29 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from adb_mcp_server import server
+
+# Stands in for adb: `adb [-s serial] shell` runs a local sh, so the persistent
+# session protocol can be exercised without a device
+FAKE_ADB = """#!/bin/sh
+if [ "$1" = "-s" ]; then shift 2; fi
+case "$1" in
+  shell) shift; if [ $# -eq 0 ]; then exec sh; else exec sh -c "$*"; fi ;;
+  *) echo "fake adb: $*"; exit 0 ;;
+esac
+"""
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    if sys.platform == "win32":
+        pytest.skip("the fake adb is a POSIX shell script")
+    adb = tmp_path / "adb"
+    adb.write_text(FAKE_ADB)
+    adb.chmod(adb.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    yield adb
+    server._close_all_shells()
@@ -0,0 +1,101 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from adb_mcp_server import server
+
+
+@pytest.fixture
+def shell(fake_adb):
+    return server._get_shell(None)
+
+
+def test_run_returns_exit_code_stdout_and_stderr(shell):
+    assert shell.run("echo out; echo err >&2") == (0, "out\n", "err")
+    assert shell.run("echo oops >&2; exit 3") == (3, "", "oops")
+
+
+def test_output_without_trailing_newline_is_preserved(shell):
+    assert shell.run("printf abc") == (0, "abc", "")
+    assert shell.run("printf 'abc\\n\\n'") == (0, "abc\n\n", "")
+    assert shell.run("true") == (0, "", "")
+
+
+def test_commands_are_isolated(shell):
+    shell.run("cd /; FOO=bar")
+    assert shell.run("pwd")[1] != "/\n"
+    assert shell.run('echo "[$FOO]"') == (0, "[]\n", "")
+    # exit only ends the command's subshell, not the session
+    assert shell.run("exit 5")[0] == 5
+    assert shell.run("echo alive") == (0, "alive\n", "")
+
+
+def test_commands_cannot_read_the_session_input(shell):
+    assert shell.run_many(["read line; echo \"[$line]\"", "echo next"]) == [
+        (0, "[]\n", ""),
+        (0, "next\n", ""),
+    ]
+
+
+def test_unterminated_quote_fails_without_hanging(shell):
+    start = time.monotonic()
+    returncode, output, errors = shell.run("echo 'x", timeout=10)
+    assert time.monotonic() - start < 5
+    assert returncode != 0 and output == "" and errors
+    assert shell.run("echo ok") == (0, "ok\n", "")
+
+
+def test_run_many_keeps_results_in_order(shell):
+    results = shell.run_many(["echo a", "echo b >&2; false", "printf c"])
+    assert results == [(0, "a\n", ""), (1, "", "b"), (0, "c", "")]
+
+
+def test_timeout_restarts_the_session(shell):
+    with pytest.raises(subprocess.TimeoutExpired):
+        shell.run("sleep 5", timeout=1)
+    assert shell.proc is None
+    assert shell.run("echo back") == (0, "back\n", "")
+
+
+def test_dead_session_is_replaced(shell):
+    shell.run("true")
+    proc = shell.proc
+    proc.kill()
+    proc.wait()
+    assert shell.run("echo again") == (0, "again\n", "")
+    assert shell.proc is not proc
+
+
+def test_close_reaps_adb_and_closes_pipes(shell):
+    shell.run("true")
+    proc = shell.proc
+    shell.close()
+    assert proc.returncode is not None
+    assert proc.stdin.closed and proc.stdout.closed
+    assert shell.proc is None
+
+
+def test_retired_session_hands_over_to_a_new_one(fake_adb):
+    old = server._get_shell(None)
+    old.run("true")
+    # Hold the lock so close_shell retires the session while a caller still holds it
+    old.lock.acquire()
+    closer = threading.Thread(target=server.close_shell, args=(None,))
+    closer.start()
+    time.sleep(0.1)
+    old.lock.release()
+    closer.join()
+    assert old.retired and old.proc is None
+    assert old.run("echo new") == (0, "new\n", "")
+    assert old.proc is None
+    assert server._shells[None] is not old
+
+
+def test_run_shell_matches_the_adb_shell_contract(fake_adb):
+    # A failing command with no stderr (grep without a match) is not an error
+    assert server.run_shell("echo a | grep b") == ""
+    assert server.run_shell("echo warning >&2; echo data") == "data\n"
+    assert server.run_shell("echo bad >&2; exit 1") == "Error: bad"
+    assert server.run_shell_batch(["echo 1", "echo 2 >&2; exit 1"]) == ["1\n", "Error: 2"]
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+from adb_mcp_server import server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def counting(result=lambda calls: "ok", **cache_options):
+    """A cached getter that records each real call"""
+    calls = []
+
+    @server.ttl_cache(**cache_options)
+    def getter(device_serial=None, fields=None):
+        calls.append((device_serial, fields))
+        return result(calls)
+
+    return getter, calls
+
+
+def test_results_are_reused_within_the_ttl(clock):
+    getter, calls = counting(seconds=1.0)
+    getter("A")
+    clock.now += 0.5
+    getter("A")
+    assert len(calls) == 1
+    clock.now += 1.0
+    getter("A")
+    assert len(calls) == 2
+
+
+def test_positional_and_keyword_calls_share_an_entry(clock):
+    getter, calls = counting()
+    getter("A")
+    getter(device_serial="A")
+    getter("A", None)
+    assert len(calls) == 1
+
+
+def test_list_arguments_are_cached(clock):
+    getter, calls = counting()
+    getter("A", ["x", "y"])
+    getter("A", fields=["x", "y"])
+    getter("A", ["y"])
+    assert len(calls) == 2
+
+
+def test_errors_and_rejected_results_are_not_cached(clock):
+    getter, calls = counting(result=lambda calls: "Error: offline")
+    getter("A")
+    getter("A")
+    assert len(calls) == 2
+
+    getter, calls = counting(result=lambda calls: len(calls), cache_if=lambda result: result > 1)
+    assert [getter("A"), getter("A"), getter("A")] == [1, 2, 2]
+
+
+def test_state_changes_only_drop_that_devices_entries(clock):
+    getter, calls = counting()
+
+    @server.changes_device_state
+    def tap(x, device_serial=None):
+        return ""
+
+    getter("A")
+    getter("B")
+    tap(1, device_serial="A")
+    getter("A")
+    getter("B")
+    assert calls == [("A", None), ("B", None), ("A", None)]
+
+
+def test_unversioned_entries_survive_state_changes(clock):
+    getter, calls = counting(versioned=False)
+    getter("A")
+    server.bump_state_version("A")
+    getter("A")
+    assert len(calls) == 1
+
+
+def test_state_is_bumped_even_when_the_tool_raises(clock):
+    getter, calls = counting()
+
+    @server.changes_device_state
+    def fail(device_serial=None):
+        raise RuntimeError("boom")
+
+    getter("A")
+    with pytest.raises(RuntimeError):
+        fail("A")
+    getter("A")
+    assert len(calls) == 2
+
+
+def test_evict_and_clear(clock):
+    getter, calls = counting()
+    getter("A")
+    getter("B")
+    getter.cache_evict(device_serial="A")
+    getter("A")
+    getter("B")
+    assert len(calls) == 3
+    getter.cache_clear()
+    getter("B")
+    assert len(calls) == 4
+
+
+def test_cached_dicts_are_copies(clock):
+    getter, calls = counting(result=lambda calls: {"width": 1080})
+    first = getter("A")
+    first["width"] = 0
+    second = getter("A")
+    second["width"] = 1
+    assert getter("A") == {"width": 1080}
+    assert len(calls) == 1